@@ -0,0 +1,204 @@
+import os
+import csv
+import sys
+import shutil
+import tempfile
+import zipfile
+
+import numpy as np
+
+import game
+import validate
+from persistance import get_field
+
+ROLLS = range(2, 13)
+
+# one row per (game, turn, player); holdings is an (n, 11) block indexed by roll - 2
+COLUMNS = ("game", "turn", "player", "roll", "holdings", "settlements", "cities", "dev_cards", "collected")
+PLAYER_COLUMNS = ("holdings", "settlements", "cities", "dev_cards", "collected")
+DTYPES = {
+    "game": np.int32,
+    "turn": np.int32,
+    "player": np.int16,
+    "roll": np.int8,
+    "holdings": np.int16,
+    "settlements": np.int16,
+    "cities": np.int16,
+    "dev_cards": np.int16,
+    "collected": np.int16,
+}
+CSV_HEADER = ",".join(
+    ["game", "turn", "player", "roll"] +
+    ["holdings_{0}".format(roll) for roll in ROLLS] +
+    ["settlements", "cities", "dev_cards", "collected"])
+
+
+def game_columns(state, game_index=0):
+    rolls = np.asarray(get_field(get_field(state, "roll_tracker"), "rolls"), dtype=DTYPES["roll"])
+    players = get_field(state, "players")
+    num_turns, num_players = len(rolls), len(players)
+    if num_turns == 0 or num_players == 0:
+        return _empty_columns()
+    num_rows = num_turns * num_players
+    turns = np.arange(num_turns, dtype=DTYPES["turn"])
+
+    # turn-major, so each turn's players sit next to each other
+    columns = {
+        "game": np.full(num_rows, game_index, dtype=DTYPES["game"]),
+        "turn": np.repeat(turns, num_players),
+        "player": np.tile(np.arange(num_players, dtype=DTYPES["player"]), num_turns),
+        "roll": np.repeat(rolls, num_players),
+    }
+    per_player = [_player_columns(player, turns, rolls) for player in players]
+    for name in PLAYER_COLUMNS:
+        stacked = np.stack([player_columns[name] for player_columns in per_player], axis=1)
+        columns[name] = stacked.reshape((num_rows,) + stacked.shape[2:]).astype(DTYPES[name], copy=False)
+    return columns
+
+
+# games are (game_index, state) pairs, so the index a row carries stays the
+# same when some games are left out; use enumerate(states) for a plain list
+def iter_chunks(games, chunk_rows=100000):
+    buffered, buffered_rows = [], 0
+    for game_index, state in games:
+        columns = game_columns(state, game_index)
+        buffered.append(columns)
+        buffered_rows += len(columns["game"])
+        if buffered_rows >= chunk_rows:
+            yield _concatenate(buffered)
+            buffered, buffered_rows = [], 0
+    if buffered:
+        yield _concatenate(buffered)
+
+
+# game_names[i] is what game index i refers to, usually the saved game's file.
+# It goes in a <file>.games.csv sidecar next to the table
+def write_csv(games, file, game_names=None, chunk_rows=100000):
+    with open(file, 'w') as f:
+        f.write(CSV_HEADER + "\n")
+        for columns in iter_chunks(games, chunk_rows):
+            table = np.column_stack([columns[name] for name in COLUMNS])
+            np.savetxt(f, table, fmt="%d", delimiter=",")
+    if game_names is not None:
+        with open(games_file(file), 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(["game", "name"])
+            writer.writerows(enumerate(game_names))
+
+
+def games_file(csv_file):
+    return os.path.splitext(csv_file)[0] + ".games.csv"
+
+
+# game_names goes in the archive as a "games" member, indexed by the game column
+def write_npz(games, file, game_names=None, chunk_rows=100000):
+    # the total row count isn't known up front, so each column is spooled to a
+    # temp file and then copied behind an .npy header inside the archive
+    spools = {name: tempfile.TemporaryFile() for name in COLUMNS}
+    try:
+        num_rows = 0
+        for columns in iter_chunks(games, chunk_rows):
+            for name in COLUMNS:
+                spools[name].write(np.ascontiguousarray(columns[name]).tobytes())
+            num_rows += len(columns["game"])
+
+        with zipfile.ZipFile(file, 'w', compression=zipfile.ZIP_STORED, allowZip64=True) as archive:
+            for name in COLUMNS:
+                shape = (num_rows, len(ROLLS)) if name == "holdings" else (num_rows,)
+                header = {
+                    "descr": np.lib.format.dtype_to_descr(np.dtype(DTYPES[name])),
+                    "fortran_order": False,
+                    "shape": shape,
+                }
+                with archive.open(name + ".npy", 'w', force_zip64=True) as member:
+                    np.lib.format.write_array_header_2_0(member, header)
+                    spools[name].seek(0)
+                    shutil.copyfileobj(spools[name], member)
+            if game_names is not None:
+                with archive.open("games.npy", 'w', force_zip64=True) as member:
+                    np.lib.format.write_array(member, np.asarray(list(game_names), dtype=str))
+    finally:
+        for spool in spools.values():
+            spool.close()
+
+
+def _player_columns(player, turns, rolls):
+    holdings = _at_turns(get_field(player, "resource_auditor"), _roll_vector, turns)
+    dev_cards = _at_turns(get_field(player, "asset_auditor"), _dev_cards, turns)
+    settlements = _at_turns(get_field(player, "settlement_auditor"), _production, turns)
+    cities = _at_turns(get_field(player, "city_auditor"), _production, turns)
+    # the roll comes before the turn's builds, so collection uses the structures
+    # from before the turn; settlements collect once per matching number, cities twice
+    production = settlements["before"][:, 1:] + 2 * cities["before"][:, 1:]
+    return {
+        "holdings": holdings["after"],
+        "settlements": settlements["after"][:, 0],
+        "cities": cities["after"][:, 0],
+        "dev_cards": dev_cards["after"],
+        "collected": production[np.arange(len(turns)), rolls.astype(np.intp) - ROLLS[0]],
+    }
+
+
+def _at_turns(auditor, convert, turns):
+    # same lookup as Auditor.get_for_turn, but for every turn at once.
+    # snapshot 0 is the starting items, snapshot i is the ith update.
+    # "before" is the state going into each turn, "after" the state at its end
+    update_turns = np.asarray(get_field(auditor, "turn_for_update"), dtype=np.int64)
+    snapshots = [get_field(auditor, "starting_items")] + list(get_field(auditor, "all_items_for_update"))
+    values = np.asarray([convert(items) for items in snapshots], dtype=np.int64)
+    return {
+        "before": values[np.searchsorted(update_turns, turns, side="left")],
+        "after": values[np.searchsorted(update_turns, turns, side="right")],
+    }
+
+
+def _dev_cards(assets):
+    return assets.get(game.Assets.DEV_CARD, 0)
+
+
+def _roll_vector(items):
+    # json turns the integer roll keys into strings
+    counts = {int(roll): count for roll, count in items.items()}
+    return [counts.get(roll, 0) for roll in ROLLS]
+
+
+def _production(structures):
+    # [number of structures, collected on 2, ..., collected on 12]
+    vector = [len(structures)] + [0] * len(ROLLS)
+    for structure in structures:
+        for roll in get_field(structure, "resources"):
+            vector[int(roll) - ROLLS[0] + 1] += 1
+    return vector
+
+
+def _empty_columns():
+    return {
+        name: np.zeros((0, len(ROLLS)) if name == "holdings" else 0, dtype=DTYPES[name])
+        for name in COLUMNS
+    }
+
+
+def _concatenate(chunks):
+    return {
+        name: np.concatenate([columns[name] for columns in chunks])
+        for name in COLUMNS
+    }
+
+
+def main(out_file, *game_files):
+    # games that break a rule invariant would export wrong rows, so they're left out
+    skipped = []
+    games = validate.valid_games(game_files, skipped=skipped)
+    if out_file.endswith(".csv"):
+        write_csv(games, out_file, game_files)
+    else:
+        write_npz(games, out_file, game_files)
+    if skipped:
+        print("Skipped {0} of {1} games; run validate.py on them for details:".format(
+            len(skipped), len(game_files)), file=sys.stderr)
+        for file in skipped:
+            print("    {0}".format(file), file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main(*sys.argv[1:])
@@ -9,6 +9,18 @@ class NotEnoughPlayers(Exception):
     pass
 
 
+class NothingToUndo(Exception):
+    pass
+
+
+class NothingToRedo(Exception):
+    pass
+
+
+class InvalidBranch(Exception):
+    pass
+
+
 class Phase:
     def __init__(self, state):
         self.state = state
@@ -69,18 +81,19 @@ class PlayPhase(Phase):
         Phase.__init__(self, state)
         # -1 so the first roll happens on the 0th turn
         self.current_turn = -1
+        self.timeline = Timeline(state)
 
     def roll(self, roll):
+        self.timeline.record(self.state.roll_tracker.add_roll, roll)
         self.current_turn += 1
-        self.state.roll_tracker.add_roll(roll)
 
     def build_settlement(self, added_resources, port=None):
         player = self.current_player()
-        player.build_settlement(self.current_turn, added_resources, port)
+        self.timeline.record(player.build_settlement, self.current_turn, added_resources, port)
 
     def upgrade(self, settlement):
         player = self.current_player()
-        player.upgrade_settlement(self.current_turn, settlement)
+        self.timeline.record(player.upgrade_settlement, self.current_turn, settlement)
 
     def get_settlements(self):
         player = self.current_player()
@@ -88,7 +101,26 @@ class PlayPhase(Phase):
 
     def get_dev_card(self):
         player = self.current_player()
-        player.asset_auditor.add_on_turn(self.current_turn, Assets.DEV_CARD)
+        self.timeline.record(player.get_development_card, self.current_turn)
+
+    def undo(self):
+        self.timeline.undo()
+        self.current_turn = self.timeline.current_turn()
+
+    def redo(self):
+        self.timeline.redo()
+        self.current_turn = self.timeline.current_turn()
+
+    def rewind(self, turn):
+        self.timeline.rewind(turn)
+        self.current_turn = self.timeline.current_turn()
+
+    def new_branch(self, name):
+        self.timeline.new_branch(name)
+
+    def checkout(self, name):
+        self.timeline.checkout(name)
+        self.current_turn = self.timeline.current_turn()
 
     def current_player(self):
         num_players = len(self.state.players)
@@ -119,6 +151,139 @@ class RollTracker:
     def get_roll(self, roll_number):
         return self.rolls[roll_number]
 
+    def num_updates(self):
+        return len(self.rolls)
+
+    def truncate(self, num_updates):
+        tail = self.rolls[num_updates:]
+        del self.rolls[num_updates:]
+        return tail
+
+    def extend(self, tail):
+        self.rolls.extend(tail)
+
+
+class Step:
+    # one recorded action. Only the histories it changed are kept, with their
+    # length before the action; while undone, tails holds what was cut off
+    def __init__(self, parent, lengths):
+        self.parent = parent
+        self.depth = 0 if parent is None else parent.depth + 1
+        self.lengths = lengths
+        self.tails = None
+
+
+class Timeline:
+    # every step is a node in a tree. The live histories always hold the path
+    # from the root to the current step, so branches share that prefix and
+    # moving between steps only touches what those steps changed.
+    # The current step is always on the way to the current branch's tip, and
+    # redo only ever moves toward that tip
+    def __init__(self, state):
+        self.state = state
+        self.current = Step(None, {})
+        self.branch = "main"
+        self.branches = {self.branch: self.current}
+
+    def record(self, action, *args):
+        before = {history: history.num_updates() for history in self._histories()}
+        action(*args)
+        lengths = {
+            history: length
+            for history, length in before.items()
+            if history.num_updates() != length
+        }
+        if len(lengths) == 0:
+            return
+        step = Step(self.current, lengths)
+        self.current = step
+        self.branches[self.branch] = step
+
+    def undo(self):
+        step = self.current
+        if step.parent is None:
+            raise NothingToUndo()
+        step.tails = {
+            history: history.truncate(length)
+            for history, length in step.lengths.items()
+        }
+        self.current = step.parent
+
+    def redo(self):
+        path = self._path_to(self.branches[self.branch])
+        if len(path) == 0:
+            raise NothingToRedo()
+        self._reapply(path[0])
+
+    # keeps everything done on the given turn; works forward too, as far as redo goes
+    def rewind(self, turn):
+        if turn < 0:
+            raise InvalidTurn("No negative turns")
+        while self.current_turn() > turn:
+            self.undo()
+        for step in self._path_to(self.branches[self.branch]):
+            starts_new_turn = self.state.roll_tracker in step.lengths
+            if starts_new_turn and self.current_turn() >= turn:
+                break
+            self._reapply(step)
+
+    def new_branch(self, name):
+        if name in self.branches:
+            raise InvalidBranch("Branch {0} already exists".format(name))
+        self.branches[name] = self.current
+        self.branch = name
+
+    def checkout(self, name):
+        if name not in self.branches:
+            raise InvalidBranch("No branch {0}".format(name))
+        target = self.branches[name]
+        ancestor = Timeline._common_ancestor(self.current, target)
+        while self.current is not ancestor:
+            self.undo()
+        for step in self._path_to(target):
+            self._reapply(step)
+        self.branch = name
+
+    def current_turn(self):
+        return self.state.roll_tracker.num_updates() - 1
+
+    def _reapply(self, step):
+        for history, tail in step.tails.items():
+            history.extend(tail)
+        step.tails = None
+        self.current = step
+
+    def _path_to(self, target):
+        # steps after the current one on the way down to target; empty if
+        # target is the current step or isn't below it
+        path = []
+        step = target
+        while step is not None and step.depth > self.current.depth:
+            path.append(step)
+            step = step.parent
+        if step is not self.current:
+            return []
+        path.reverse()
+        return path
+
+    def _histories(self):
+        yield self.state.roll_tracker
+        for player in self.state.players:
+            yield player.resource_auditor
+            yield player.asset_auditor
+            yield player.settlement_auditor
+            yield player.city_auditor
+
+    @staticmethod
+    def _common_ancestor(step_one, step_two):
+        while step_one.depth > step_two.depth:
+            step_one = step_one.parent
+        while step_two.depth > step_one.depth:
+            step_two = step_two.parent
+        while step_one is not step_two:
+            step_one, step_two = step_one.parent, step_two.parent
+        return step_one
+
 
 class Player:
     def __init__(self, name):
@@ -211,6 +376,20 @@ class Auditor:
         self.all_items_for_update.append(all_items)
         self.turn_for_update.append(turn)
 
+    def num_updates(self):
+        return len(self.turn_for_update)
+
+    # updates are never mutated once made, so the cut off tail can be put back as is
+    def truncate(self, num_updates):
+        tail = list(zip(self.turn_for_update[num_updates:], self.all_items_for_update[num_updates:]))
+        del self.turn_for_update[num_updates:]
+        del self.all_items_for_update[num_updates:]
+        return tail
+
+    def extend(self, tail):
+        for turn, all_items in tail:
+            self._update_for_turn(turn, all_items)
+
     @classmethod
     def perform_conversion(cls, items):
         return items
@@ -16,6 +16,19 @@ def save(state, file=None):
         f.write(res)
 
 
+def load(file):
+    with open(file) as f:
+        return json.load(f)
+
+
+# reads a field from a live game object as well as from the dict that load
+# gives back for it, so analysis code can take either
+def get_field(obj, key):
+    if isinstance(obj, dict):
+        return obj[key]
+    return getattr(obj, key)
+
+
 def _get_new_save_location():
     instant = datetime.datetime.now()
     month, year, hour, minute = instant.month, instant.day, instant.hour, instant.minute
@@ -261,6 +261,16 @@ class PlayPhaseHandler(Handler):
             self.process_dev_card()
         elif keyword == "save":
             self.process_save(args)
+        elif keyword == "undo":
+            self.process_undo()
+        elif keyword == "redo":
+            self.process_redo()
+        elif keyword == "rewind":
+            self.process_rewind(args)
+        elif keyword == "branch":
+            self.process_branch(args)
+        elif keyword == "checkout":
+            self.process_checkout(args)
         return self
 
     @staticmethod
@@ -270,7 +280,12 @@ class PlayPhaseHandler(Handler):
               "build <srcroll1> [<srcroll2> [<srcroll3>]]\n"
               "upgrade\n"
               "devcard\n"
-              "save")
+              "save\n"
+              "undo\n"
+              "redo\n"
+              "rewind <turn>\n"
+              "branch <branchname>\n"
+              "checkout <branchname>")
 
     def process_roll(self, roll):
         try:
@@ -297,6 +312,44 @@ class PlayPhaseHandler(Handler):
             args = None
         persistance.save(self.play_phase.state, args)
 
+    def process_undo(self):
+        try:
+            self.play_phase.undo()
+        except game.NothingToUndo:
+            print("Nothing to undo")
+
+    def process_redo(self):
+        try:
+            self.play_phase.redo()
+        except game.NothingToRedo:
+            print("Nothing to redo")
+
+    def process_rewind(self, turn):
+        try:
+            self.play_phase.rewind(int(turn))
+        except (ValueError, game.InvalidTurn):
+            print("A turn should be a non-negative integer")
+
+    def process_branch(self, name):
+        name = name.strip()
+        if len(name) == 0:
+            print("Currently on branch {0}".format(self.play_phase.timeline.branch))
+            return
+        try:
+            self.play_phase.new_branch(name)
+        except game.InvalidBranch as e:
+            print(e)
+
+    def process_checkout(self, name):
+        name = name.strip()
+        if len(name) == 0:
+            print("Must provide a branchname")
+            return
+        try:
+            self.play_phase.checkout(name)
+        except game.InvalidBranch as e:
+            print(e)
+
     def get_next_handler(self):
         if self.port_check_handler is not None:
             return self.port_check_handler
@@ -0,0 +1,117 @@
+import io
+import os
+import json
+import tempfile
+import unittest
+from contextlib import redirect_stderr
+
+import numpy as np
+
+import game
+import export
+import persistance
+
+
+def new_game():
+    state = game.State()
+    setup_phase = game.SetupPhase(state)
+    setup_phase.add_player("a")
+    setup_phase.add_player("b")
+    build_phase = game.BuildPhase(state)
+    # snake order: a, b, b, a
+    for resources in ([6, 8], [4], [5], [3, 11]):
+        build_phase.build_starting_settlement(resources)
+    play_phase = game.PlayPhase(state)
+    play_phase.roll(6)
+    play_phase.build_settlement([6, 6, 6])
+    play_phase.roll(9)
+    play_phase.get_dev_card()
+    play_phase.roll(6)
+    play_phase.upgrade(play_phase.get_settlements()[0])
+    play_phase.roll(6)
+    return state
+
+
+class ExportTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.state = new_game()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.directory.name, name)
+
+    def save(self, name, state=None):
+        file = self.path(name)
+        persistance.save(self.state if state is None else state, file)
+        return file
+
+    def test_live_and_saved_state_match(self):
+        live = export.game_columns(self.state, 3)
+        saved = export.game_columns(persistance.load(self.save("game.json")), 3)
+        for name in export.COLUMNS:
+            np.testing.assert_array_equal(live[name], saved[name])
+        self.assertEqual(live["game"].tolist(), [3] * 8)
+        self.assertEqual(live["turn"].tolist(), [0, 0, 1, 1, 2, 2, 3, 3])
+        self.assertEqual(live["player"].tolist(), [0, 1] * 4)
+
+    def test_collected_uses_structures_from_before_the_turn(self):
+        columns = export.game_columns(self.state)
+        player_a = columns["player"] == 0
+        # turn 0: [6, 6, 6] is built after the 6 is rolled
+        # turn 2: [6, 8] is upgraded after the 6 is rolled
+        # turn 3: the city collects twice, [6, 6, 6] three times
+        self.assertEqual(columns["collected"][player_a].tolist(), [1, 0, 4, 5])
+        self.assertEqual(columns["settlements"][player_a].tolist(), [3, 3, 2, 2])
+        self.assertEqual(columns["cities"][player_a].tolist(), [0, 0, 1, 1])
+        self.assertEqual(columns["dev_cards"][~player_a].tolist(), [0, 1, 1, 1])
+        self.assertEqual(columns["holdings"][0].tolist(), [0, 1, 0, 0, 4, 0, 1, 0, 0, 1, 0])
+
+    def test_write_npz(self):
+        file = self.path("out.npz")
+        export.write_npz(enumerate([self.state, self.state]), file, ["one", "two"], chunk_rows=5)
+        archive = np.load(file)
+        self.assertEqual(sorted(archive.files), sorted(export.COLUMNS + ("games",)))
+        for name in export.COLUMNS:
+            self.assertEqual(archive[name].dtype, np.dtype(export.DTYPES[name]))
+            self.assertEqual(len(archive[name]), 16)
+        self.assertEqual(archive["holdings"].shape, (16, len(export.ROLLS)))
+        self.assertEqual(archive["games"].tolist(), ["one", "two"])
+        np.testing.assert_array_equal(archive["collected"][8:], export.game_columns(self.state)["collected"])
+
+    def test_write_csv(self):
+        file = self.path("out.csv")
+        export.write_csv(enumerate([self.state, self.state]), file, ["one", "two"], chunk_rows=5)
+        with open(file) as f:
+            lines = f.read().splitlines()
+        self.assertEqual(lines[0], export.CSV_HEADER)
+        self.assertEqual(len(lines), 17)
+        self.assertEqual(lines[1], "0,0,0,6,0,1,0,0,4,0,1,0,0,1,0,3,0,0,1")
+        with open(export.games_file(file)) as f:
+            self.assertEqual(f.read().splitlines(), ["game,name", "0,one", "1,two"])
+
+    def test_main_keeps_game_indices_when_games_are_skipped(self):
+        good = self.save("good.json")
+        bad = self.save("bad.json")
+        with open(bad) as f:
+            saved = json.load(f)
+        saved["roll_tracker"]["rolls"][1] = 13
+        with open(bad, 'w') as f:
+            json.dump(saved, f)
+
+        file = self.path("out.npz")
+        errors = io.StringIO()
+        with redirect_stderr(errors):
+            export.main(file, good, bad, good)
+        archive = np.load(file)
+        self.assertEqual(np.unique(archive["game"]).tolist(), [0, 2])
+        self.assertEqual(archive["games"].tolist(), [good, bad, good])
+        self.assertIn("Skipped 1 of 3 games", errors.getvalue())
+        self.assertIn(bad, errors.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()
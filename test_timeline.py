@@ -0,0 +1,144 @@
+import io
+import unittest
+from contextlib import redirect_stdout
+
+import game
+import repl
+
+
+def new_play_phase():
+    state = game.State()
+    setup_phase = game.SetupPhase(state)
+    setup_phase.add_player("a")
+    setup_phase.add_player("b")
+    build_phase = game.BuildPhase(state)
+    for resources in ([6, 8], [4], [5], [3, 11]):
+        build_phase.build_starting_settlement(resources)
+    return game.PlayPhase(state)
+
+
+def snapshot(play_phase):
+    state = play_phase.state
+    histories = [list(state.roll_tracker.rolls)]
+    for player in state.players:
+        for auditor in (player.resource_auditor, player.asset_auditor,
+                        player.settlement_auditor, player.city_auditor):
+            histories.append((list(auditor.turn_for_update), list(auditor.all_items_for_update)))
+    return play_phase.current_turn, histories
+
+
+class TimelineTest(unittest.TestCase):
+
+    def setUp(self):
+        self.play_phase = new_play_phase()
+        self.play_phase.roll(6)
+        self.play_phase.build_settlement([6, 6, 6])
+        self.play_phase.roll(9)
+        self.play_phase.get_dev_card()
+        self.play_phase.roll(8)
+        self.play_phase.upgrade(self.play_phase.get_settlements()[0])
+        self.rolls = self.play_phase.state.roll_tracker.rolls
+
+    def test_undo_redo_round_trip(self):
+        full = snapshot(self.play_phase)
+        for _ in range(6):
+            self.play_phase.undo()
+        self.assertEqual(self.rolls, [])
+        self.assertEqual(self.play_phase.current_turn, -1)
+        self.assertFalse(self.play_phase.has_rolled())
+        self.assertRaises(game.NothingToUndo, self.play_phase.undo)
+        for _ in range(6):
+            self.play_phase.redo()
+        self.assertEqual(snapshot(self.play_phase), full)
+        self.assertRaises(game.NothingToRedo, self.play_phase.redo)
+
+    def test_rewind_backward_and_forward(self):
+        full = snapshot(self.play_phase)
+        self.play_phase.rewind(0)
+        self.assertEqual(self.rolls, [6])
+        # turn 0's build is kept
+        self.assertEqual(len(self.play_phase.state.players[0].settlement_auditor.turn_for_update), 1)
+        self.play_phase.rewind(1)
+        self.assertEqual(self.rolls, [6, 9])
+        self.assertEqual(self.play_phase.current_turn, 1)
+        self.assertEqual(self.play_phase.state.players[1].asset_auditor.turn_for_update, [1])
+        self.play_phase.rewind(5)
+        self.assertEqual(snapshot(self.play_phase), full)
+        self.assertRaises(game.InvalidTurn, self.play_phase.rewind, -1)
+
+    def test_branch_from_undone_point_and_checkout_back(self):
+        full = snapshot(self.play_phase)
+        self.play_phase.rewind(0)
+        self.play_phase.new_branch("whatif")
+        self.play_phase.roll(12)
+        self.play_phase.build_settlement([12])
+        alternative = snapshot(self.play_phase)
+
+        self.play_phase.checkout("main")
+        self.assertEqual(snapshot(self.play_phase), full)
+        self.play_phase.checkout("whatif")
+        self.assertEqual(snapshot(self.play_phase), alternative)
+        self.assertRaises(game.InvalidBranch, self.play_phase.new_branch, "main")
+        self.assertRaises(game.InvalidBranch, self.play_phase.checkout, "nope")
+
+    def test_redo_after_checkout_stays_on_branch(self):
+        self.play_phase.new_branch("alt")
+        self.play_phase.roll(12)
+        self.play_phase.checkout("main")
+        self.assertRaises(game.NothingToRedo, self.play_phase.redo)
+        self.play_phase.roll(4)
+        self.assertEqual(self.rolls, [6, 9, 8, 4])
+        self.play_phase.checkout("alt")
+        self.assertEqual(self.rolls, [6, 9, 8, 12])
+
+    def test_redo_does_not_leave_branch_behind_main(self):
+        self.play_phase.rewind(0)
+        self.play_phase.new_branch("early")
+        self.play_phase.checkout("main")
+        self.play_phase.checkout("early")
+        self.assertRaises(game.NothingToRedo, self.play_phase.redo)
+        self.assertEqual(self.rolls, [6])
+
+
+class PlayPhaseHandlerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.handler = repl.PlayPhaseHandler(new_play_phase())
+        self.rolls = self.handler.play_phase.state.roll_tracker.rolls
+
+    def run_commands(self, *commands):
+        out = io.StringIO()
+        with redirect_stdout(out):
+            for command in commands:
+                self.handler.process_command(command)
+        return out.getvalue()
+
+    def test_undo_redo_rewind(self):
+        self.assertEqual(self.run_commands("undo"), "Nothing to undo\n")
+        self.run_commands("roll 6", "roll 8", "roll 9", "undo")
+        self.assertEqual(self.rolls, [6, 8])
+        self.run_commands("redo", "rewind 0")
+        self.assertEqual(self.rolls, [6])
+        self.assertEqual(self.run_commands("rewind x"), "A turn should be a non-negative integer\n")
+        self.run_commands("rewind 2")
+        self.assertEqual(self.rolls, [6, 8, 9])
+        self.assertEqual(self.run_commands("redo"), "Nothing to redo\n")
+
+    def test_branch_and_checkout(self):
+        self.run_commands("roll 6", "branch alt", "roll 12", "checkout main")
+        self.assertEqual(self.rolls, [6])
+        self.assertEqual(self.run_commands("branch"), "Currently on branch main\n")
+        self.assertEqual(self.run_commands("checkout nope"), "No branch nope\n")
+        self.run_commands("checkout alt")
+        self.assertEqual(self.rolls, [6, 12])
+
+    def test_branch_names_are_stripped(self):
+        self.run_commands("roll 6", "branch  alt ", "roll 12", "checkout  main")
+        self.assertEqual(self.rolls, [6])
+        self.run_commands("checkout alt")
+        self.assertEqual(self.rolls, [6, 12])
+        self.assertEqual(self.run_commands("checkout "), "Must provide a branchname\n")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,221 @@
+import os
+import sys
+from multiprocessing import Pool
+
+import persistance
+from persistance import get_field
+
+MIN_ROLL, MAX_ROLL = 2, 12
+# a 7 is a legal roll but no hex carries it, so nothing collects on it
+ROBBER_ROLL = 7
+MAX_RESOURCES_PER_SETTLEMENT = 3
+STARTING_SETTLEMENTS = 2
+MAX_SETTLEMENTS = 5
+MAX_CITIES = 4
+WINDOW_PER_PROCESS = 4
+AUDITORS = ("resource_auditor", "asset_auditor", "settlement_auditor", "city_auditor")
+
+
+class Violation:
+    def __init__(self, message, player=None, turn=None):
+        self.message = message
+        self.player = player
+        self.turn = turn
+
+    def __repr__(self):
+        where = []
+        if self.player is not None:
+            where.append("player {0}".format(self.player))
+        if self.turn is not None:
+            where.append("turn {0}".format(self.turn))
+        if not where:
+            return self.message
+        return "{0}: {1}".format(", ".join(where), self.message)
+
+
+def validate(state):
+    violations = []
+    rolls = get_field(get_field(state, "roll_tracker"), "rolls")
+    players = get_field(state, "players")
+    violations += _check_rolls(rolls)
+    violations += _check_starting_settlements(players)
+    for player_index, player in enumerate(players):
+        name = get_field(player, "name")
+        for auditor_name in AUDITORS:
+            violations += _check_history(get_field(player, auditor_name), auditor_name, name, len(rolls))
+        violations += _check_turn_owner(player, player_index, len(players), name)
+        violations += _check_structures(player, name)
+    return violations
+
+
+# the state only comes back for clean games, so bad ones are never sent between processes
+def validate_file(file):
+    try:
+        state = persistance.load(file)
+        violations = validate(state)
+    except (OSError, ValueError, KeyError, TypeError, AttributeError) as e:
+        return file, [Violation("unreadable game: {0!r}".format(e))], None
+    return file, violations, None if violations else state
+
+
+def validate_files(files, processes=None, window=None):
+    # one game per task; results come back in the order the files were given.
+    # Files go out a window at a time so finished games can't pile up in this
+    # process when whoever is consuming them is slower than the workers
+    files = list(files)
+    if window is None:
+        window = (processes or os.cpu_count() or 1) * WINDOW_PER_PROCESS
+    with Pool(processes) as pool:
+        for start in range(0, len(files), window):
+            for file, violations, state in pool.imap(validate_file, files[start:start + window]):
+                yield file, violations, state
+
+
+def valid_games(files, processes=None, skipped=None):
+    # (game_index, state) for the clean games, indexed by position in files so
+    # export keeps the same game numbers whatever gets dropped. Dropped files
+    # are appended to skipped, if given
+    for game_index, (file, violations, state) in enumerate(validate_files(files, processes)):
+        if violations:
+            if skipped is not None:
+                skipped.append(file)
+        else:
+            yield game_index, state
+
+
+def _check_rolls(rolls):
+    violations = []
+    for turn, roll in enumerate(rolls):
+        if not isinstance(roll, int) or not MIN_ROLL <= roll <= MAX_ROLL:
+            violations.append(Violation("illegal roll {0!r}".format(roll), turn=turn))
+    return violations
+
+
+def _check_starting_settlements(players):
+    # a saved game doesn't record the order of the build phase, only what each
+    # player ended up with: two starting settlements
+    violations = []
+    for player in players:
+        starting = len(get_field(get_field(player, "settlement_auditor"), "starting_items"))
+        if starting != STARTING_SETTLEMENTS:
+            violations.append(Violation(
+                "{0} starting settlements, the build phase gives {1}".format(starting, STARTING_SETTLEMENTS),
+                player=get_field(player, "name")))
+    return violations
+
+
+def _check_history(auditor, auditor_name, name, num_turns):
+    turns = get_field(auditor, "turn_for_update")
+    items = get_field(auditor, "all_items_for_update")
+    violations = []
+    if len(turns) != len(items):
+        violations.append(Violation(
+            "{0} has {1} updates but {2} turns".format(auditor_name, len(items), len(turns)), player=name))
+    previous = 0
+    for turn in turns:
+        # get_for_turn searches backward, so an out of order turn hides later updates
+        if turn < previous:
+            violations.append(Violation(
+                "{0} update out of order after turn {1}".format(auditor_name, previous), player=name, turn=turn))
+        if not 0 <= turn < num_turns:
+            violations.append(Violation(
+                "{0} update on a turn that was never rolled".format(auditor_name), player=name, turn=turn))
+        previous = max(previous, turn)
+    return violations
+
+
+def _check_turn_owner(player, player_index, num_players, name):
+    # PlayPhase.current_player: only the player whose turn it is can build or buy
+    turns = set()
+    for auditor_name in AUDITORS:
+        turns.update(get_field(get_field(player, auditor_name), "turn_for_update"))
+    return [
+        Violation("acted on another player's turn", player=name, turn=turn)
+        for turn in sorted(turns)
+        if turn % num_players != player_index
+    ]
+
+
+def _check_structures(player, name):
+    violations = []
+    settlement_auditor = get_field(player, "settlement_auditor")
+    city_auditor = get_field(player, "city_auditor")
+
+    # each settlement is checked on the turn it was built; starting ones have no turn
+    previous_settlements = []
+    built = [(None, get_field(settlement_auditor, "starting_items"))] + list(_updates(settlement_auditor))
+    for turn, settlements in built:
+        if len(settlements) > MAX_SETTLEMENTS:
+            violations.append(Violation("{0} settlements".format(len(settlements)), player=name, turn=turn))
+        for settlement in _added(previous_settlements, settlements):
+            violations += _check_settlement(settlement, name, turn)
+        previous_settlements = settlements
+
+    # every city must come from one of the player's settlements on the same turn
+    previous_cities = get_field(city_auditor, "starting_items")
+    for turn, cities in _updates(city_auditor):
+        if len(cities) > MAX_CITIES:
+            violations.append(Violation("{0} cities".format(len(cities)), player=name, turn=turn))
+        for city in _added(previous_cities, cities):
+            before = _settlements_before(settlement_auditor, turn)
+            if city not in before:
+                violations.append(Violation("upgraded a settlement it doesn't own: {0}".format(
+                    get_field(city, "resources")), player=name, turn=turn))
+        previous_cities = cities
+    return violations
+
+
+def _check_settlement(settlement, name, turn):
+    violations = []
+    resources = get_field(settlement, "resources")
+    if len(resources) > MAX_RESOURCES_PER_SETTLEMENT:
+        violations.append(Violation(
+            "settlement collects on {0} rolls".format(len(resources)), player=name, turn=turn))
+    for roll in resources:
+        if not MIN_ROLL <= roll <= MAX_ROLL or roll == ROBBER_ROLL:
+            violations.append(Violation("settlement collects on roll {0}".format(roll), player=name, turn=turn))
+    return violations
+
+
+def _settlements_before(auditor, turn):
+    # last settlement list recorded before this turn, or earlier in this turn
+    # but before the removal that the upgrade caused
+    items = get_field(auditor, "starting_items")
+    for update_turn, update_items in _updates(auditor):
+        if update_turn > turn:
+            break
+        if update_turn == turn and len(update_items) < len(items):
+            break
+        items = update_items
+    return items
+
+
+def _updates(auditor):
+    return zip(get_field(auditor, "turn_for_update"), get_field(auditor, "all_items_for_update"))
+
+
+def _added(old_items, new_items):
+    remaining = list(old_items)
+    added = []
+    for item in new_items:
+        if item in remaining:
+            remaining.remove(item)
+        else:
+            added.append(item)
+    return added
+
+
+def main(*game_files):
+    bad_games = 0
+    for file, violations, state in validate_files(game_files):
+        if violations:
+            bad_games += 1
+            print(file)
+            for violation in violations:
+                print("    {0}".format(violation))
+    print("{0} of {1} games have violations".format(bad_games, len(game_files)))
+    return 1 if bad_games else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(*sys.argv[1:]))